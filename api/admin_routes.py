@@ -1 +0,0 @@
-router = APIRouter(prefix="/admin") и @router.post("/weeks/current/songs/enrich")
\ No newline at end of file
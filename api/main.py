@@ -5,23 +5,35 @@ from __future__ import annotations
 # 1) IMPORTS
 # =========================
 import os
+import sys
 import shutil
 import re
-import json
 import hmac
 import time
 import hashlib
+import threading
+import secrets
+import operator
 import traceback
 from pathlib import Path
+from collections import Counter, OrderedDict, defaultdict
+from itertools import compress
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Literal, Tuple
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from urllib.parse import parse_qsl
 from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
 
+import orjson
 import requests
-from fastapi import FastAPI, Body, Header, HTTPException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from fastapi import FastAPI, Body, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
 
@@ -55,11 +67,15 @@ SONGS_PATH = BASE_DIR / "songs.json"
 DATA_DIR = Path(os.getenv("DATA_DIR", "/data"))
 VOTES_PATH = DATA_DIR / "votes.json"
 WEEK_META_PATH = DATA_DIR / "week_meta.json"
+ITUNES_CACHE_PATH = DATA_DIR / "itunes_cache.json"
 ARCHIVE_DIR = DATA_DIR / "archive"
 
 VOTES_PATH = _pick_persistent_path(VOTES_PATH, BASE_DIR / "votes.json")
 WEEK_META_PATH = _pick_persistent_path(WEEK_META_PATH, BASE_DIR / "week_meta.json")
+ITUNES_CACHE_PATH = _pick_persistent_path(ITUNES_CACHE_PATH, BASE_DIR / "itunes_cache.json")
 ARCHIVE_DIR = (_pick_persistent_path(ARCHIVE_DIR / ".keep", BASE_DIR / "archive" / ".keep")).parent
+# журнал голосов (append-only) — рядом со снапшотом votes.json
+VOTES_WAL_PATH = VOTES_PATH.with_name("votes.wal")
 
 def _ensure_data_dir() -> None:
     try:
@@ -87,13 +103,34 @@ def _seed_file_if_missing(dst: Path, src: Path) -> None:
 
 CURRENT_WEEK_ID = int(os.getenv("CURRENT_WEEK_ID", "3"))
 ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+_ADMIN_TOKEN_B = ADMIN_TOKEN.encode("utf-8")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")  # желательно задать
+# успешная проверка initData живёт в памяти N секунд (мини-апп шлёт одну и ту же строку)
+TG_AUTH_CACHE_TTL = float(os.getenv("TG_AUTH_CACHE_TTL", "300"))
+TG_AUTH_CACHE_MAX = int(os.getenv("TG_AUTH_CACHE_MAX", "2048"))
+# сколько секунд initData считается свежим по auth_date (0 = не проверяем, защита от повтора выкл.)
+TG_AUTH_MAX_AGE = int(os.getenv("TG_AUTH_MAX_AGE", "0"))
 
 # лимит песен в одном голосовании (сколько треков можно выбрать за раз)
 VOTE_LIMIT_PER_USER = int(os.getenv("VOTE_LIMIT_PER_USER", "20"))
 
+# votes.json пишем не на каждый голос, а пачкой: не чаще раза в N секунд
+VOTES_FLUSH_DELAY = float(os.getenv("VOTES_FLUSH_DELAY", "2.0"))
+# каждый голос — строка в votes.wal; снапшот votes.json (и обрезка журнала) — раз в N голосов
+VOTES_WAL_COMPACT_EVERY = int(os.getenv("VOTES_WAL_COMPACT_EVERY", "500"))
+
 ITUNES_COUNTRY = os.getenv("ITUNES_COUNTRY", "US")
 ITUNES_LIMIT = int(os.getenv("ITUNES_LIMIT", "5"))
+# (connect, read) секунд на запрос к iTunes; ретраи — только на connect, чтобы
+# медленный ответ не умножал время enrich (худший случай ~ 3 * connect + read)
+ITUNES_TIMEOUT = (3.0, 6.0)
+# сколько запросов в iTunes гоняем параллельно при enrich
+ITUNES_WORKERS = int(os.getenv("ITUNES_WORKERS", "8"))
+# сколько живёт запись в кэше iTunes: найденный трек / "не нашли"
+ITUNES_CACHE_TTL = int(os.getenv("ITUNES_CACHE_TTL", str(30 * 24 * 3600)))
+ITUNES_CACHE_MISS_TTL = int(os.getenv("ITUNES_CACHE_MISS_TTL", str(24 * 3600)))
+# потолок записей в itunes_cache.json (лишние — самые старые — выкидываем)
+ITUNES_CACHE_MAX = int(os.getenv("ITUNES_CACHE_MAX", "5000"))
 
 MSK = ZoneInfo("Europe/Moscow")
 
@@ -103,10 +140,45 @@ VOTING_CLOSE_MINUTE = 0
 
 # In-memory stores
 SONGS_BY_WEEK: Dict[int, List[dict]] = {}
-# votes: week_id -> {song_id(int): votes(int)}
-VOTES: Dict[int, Dict[int, int]] = {}
+# SoA-индекс под /songs: week_id -> filter("all"/"new"/"current") ->
+# (песни, их search-blob'ы) — параллельные кортежи
+SONGS_VIEW_BY_WEEK: Dict[int, Dict[str, Tuple[Tuple[dict, ...], Tuple[str, ...]]]] = {}
+# id песен недели — для проверки голосов без прохода по списку
+SONG_IDS_BY_WEEK: Dict[int, frozenset[int]] = {}
+# версия состава недели: растёт на каждый set_week_songs
+SONGS_VERSION: Dict[int, int] = {}
+# готовые ответы /weeks/{id}/songs (LRU): (week_id, version, filter, q) -> (body, etag)
+SONGS_RESPONSE_CACHE: OrderedDict[Tuple[int, int, str, str], Tuple[bytes, str]] = OrderedDict()
+SONGS_RESPONSE_CACHE_MAX = 512
+# votes: week_id -> Counter{song_id(int): votes(int)}
+VOTES: Dict[int, Counter[int]] = {}
 # user_votes: week_id -> {user_id(str): [song_id...]}
 USER_VOTES: Dict[int, Dict[str, List[int]]] = {}
+# sync-ручки крутятся в threadpool: мутации голосов недели — под её локом
+VOTE_LOCKS: Dict[int, threading.Lock] = defaultdict(threading.Lock)
+# один писатель votes.json за раз (общий .tmp, порядок снапшотов)
+VOTES_SAVE_LOCK = threading.Lock()
+# пора снапшотить голоса -> фоновый поток сбросит их в votes.json (и обрежет votes.wal)
+VOTES_DIRTY = threading.Event()
+# votes.wal: один дописывающий за раз; компакция держит его на всё время снапшот+обрезка
+VOTES_WAL_LOCK = threading.Lock()
+_VOTES_WAL_FILE: Optional[Any] = None
+# сколько голосов в журнале с последней компакции
+VOTES_WAL_PENDING = 0
+# версия голосов недели: растёт на каждый принятый голос (под VOTE_LOCKS)
+VOTES_VERSION: Dict[int, int] = {}
+# готовый summary: week_id -> (etag, body)
+VOTES_SUMMARY_CACHE: Dict[int, Tuple[str, bytes]] = {}
+# последний записанный в votes.json вид недели: week_id -> (VOTES_VERSION, {"votes", "user_votes"})
+_VOTES_SNAPSHOT: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+# рейтинг недели: week_id -> ((версия состава, версия голосов), строки по убыванию голосов)
+VOTES_RANKING_CACHE: Dict[int, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+# версии живут в памяти — метка процесса, чтобы ETag не совпал после рестарта
+_BOOT_ID = secrets.token_hex(4)
+# itunes cache: "artist|title" -> {"cover", "preview_url", "ts"}
+ITUNES_CACHE: Dict[str, dict] = {}
+# воркеры enrich пишут в кэш параллельно — вставка и prune+снимок под локом
+ITUNES_CACHE_LOCK = threading.Lock()
 
 
 # =========================
@@ -116,28 +188,99 @@ def _now_ts() -> int:
     return int(time.time())
 
 
-def _atomic_write_text(path: Path, text: str) -> None:
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(text, encoding="utf-8")
-    tmp.replace(path)
+# данные файла — fdatasync (без лишнего сброса atime/mtime); имена переживают падение
+# через _fsync_dir. Где fdatasync нет (macOS/Windows) — обычный fsync
+_fdatasync = getattr(os, "fdatasync", os.fsync)
 
 
-def _atomic_write_json(path: Path, obj) -> None:
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        n = os.write(fd, view)
+        view = view[n:]
+
+
+def _fsync_dir(d: Path) -> None:
+    """fsync папки — чтобы сам rename пережил падение. Где нельзя (Windows) — молча пропускаем."""
+    try:
+        fd = os.open(d, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_tmp_via_o_tmpfile(tmp_path: Path, data: bytes) -> bool:
     """
-    Пишем JSON атомарно: сначала во временный файл рядом, потом replace.
-    ВАЖНО: path уже абсолютный/полный, НЕ надо добавлять API_DIR повторно.
+    Linux: пишем в безымянный файл (O_TMPFILE) и даём ему имя .tmp
+    только когда данные уже на диске — недописанный .tmp не появляется.
+    False — не вышло (нет O_TMPFILE, ФС/песочница не даёт linkat): нужен обычный путь.
     """
-    path.parent.mkdir(parents=True, exist_ok=True)
+    o_tmpfile = getattr(os, "O_TMPFILE", None)
+    if o_tmpfile is None:
+        return False
+    try:
+        fd = os.open(tmp_path.parent, o_tmpfile | os.O_WRONLY, 0o644)
+    except OSError:
+        return False
+    try:
+        _write_all(fd, data)
+        _fdatasync(fd)
+        tmp_path.unlink(missing_ok=True)
+        os.link(f"/proc/self/fd/{fd}", tmp_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
 
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
 
-    data = json.dumps(obj, ensure_ascii=False, indent=2)
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """
+    Атомарно и с fsync: данные -> .tmp рядом -> replace -> fsync папки.
+    Папки создаёт startup; mkdir здесь — только если её всё-таки нет (не на каждую запись).
+    """
+    try:
+        _atomic_write_bytes_once(path, data)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes_once(path, data)
+
+
+def _atomic_write_bytes_once(path: Path, data: bytes) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
 
-    # Пишем без BOM (utf-8)
-    tmp_path.write_text(data, encoding="utf-8")
+    if not _write_tmp_via_o_tmpfile(tmp_path, data):
+        # голый fd: без буферизованной обёртки file-объекта
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            _write_all(fd, data)
+            _fdatasync(fd)
+        finally:
+            os.close(fd)
 
     # атомарная замена
-    tmp_path.replace(path)
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    _atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def _atomic_write_json(path: Path, obj) -> None:
+    """
+    Пишем JSON атомарно: сначала во временный файл рядом, потом replace.
+    ВАЖНО: path уже абсолютный/полный, НЕ надо добавлять API_DIR повторно.
+    """
+    # orjson сразу отдаёт utf-8 байты (без BOM), int-ключи пишет как строки
+    data = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    _atomic_write_bytes(path, data)
 
 
 def _ensure_dir(p: Path) -> None:
@@ -157,16 +300,34 @@ def _path_is_writable(p: Path) -> bool:
         return False
 
 
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def _strip_bom(raw: bytes) -> bytes:
+    return raw[len(_UTF8_BOM):] if raw.startswith(_UTF8_BOM) else raw
+
+
 def _read_json_bom_safe(path: Path) -> Any:
     """
-    BOM-safe чтение JSON:
-    - utf-8-sig снимает BOM
-    - пустой файл -> None
+    BOM-safe чтение JSON: одно read_bytes, BOM срезаем с байтов,
+    orjson парсит bytes без декодирования в str.
+    Пустой файл / одни пробелы -> None.
+    (Без mmap: файл, обрезанный на месте руками/чужим процессом, дал бы SIGBUS.)
     """
-    raw = path.read_text(encoding="utf-8-sig")
+    raw = _strip_bom(path.read_bytes())
     if not raw.strip():
         return None
-    return json.loads(raw)
+    return orjson.loads(raw)
+
+
+def _as_int(v: Any, default: Optional[int] = None) -> Optional[int]:
+    """int(v) без try в частом случае: в файле числа уже int."""
+    if type(v) is int:
+        return v
+    try:
+        return int(v)
+    except (TypeError, ValueError, OverflowError):
+        return default
 
 
 def normalize_songs(items: Any) -> List[dict]:
@@ -182,58 +343,52 @@ def normalize_songs(items: Any) -> List[dict]:
 
     out: List[dict] = []
     seen_ids: set[int] = set()
+    # одинаковые артисты (альбом, фиты) — один объект строки на всех
+    artist_pool: Dict[str, str] = {}
+    # методы — в локалы: в цикле без поиска атрибутов на каждую строку
+    seen_add = seen_ids.add
+    pool = artist_pool.setdefault
+    append = out.append
+    intern = sys.intern
 
     for x in items:
         if not isinstance(x, dict):
             continue
+        get = x.get
 
-        try:
-            sid = int(x.get("id"))
-        except Exception:
-            continue
-        if sid <= 0:
-            continue
-
-        if sid in seen_ids:
+        sid = _as_int(get("id"))
+        if sid is None or sid <= 0 or sid in seen_ids:
             continue
-        seen_ids.add(sid)
+        seen_add(sid)
 
-        artist = str(x.get("artist") or "").strip()
-        title = str(x.get("title") or "").strip()
+        artist = str(get("artist") or "").strip()
+        artist = pool(artist, artist)
+        title = str(get("title") or "").strip()
 
-        cover = x.get("cover", None)
-        preview_url = x.get("preview_url", None)
+        is_new = bool(get("is_new", False))
 
-        source = str(x.get("source") or "").strip()
+        source = str(get("source") or "").strip()
         if not source:
-            source = "new" if bool(x.get("is_new")) else "carryover"
-
-        is_new = bool(x.get("is_new", False))
-
-        weeks_in_chart = x.get("weeks_in_chart", 1)
-        try:
-            weeks_in_chart = int(weeks_in_chart)
-        except Exception:
-            weeks_in_chart = 1
-
-        lock_media = bool(x.get("lock_media", False))
+            source = "new" if is_new else "carryover"
+        # словарь source крошечный ("new"/"carryover"/...) — интернируем
+        source = intern(source)
 
         if "is_current" in x:
-            is_current = bool(x.get("is_current"))
+            is_current = bool(get("is_current"))
         else:
             is_current = (source.lower() == "carryover")
 
-        out.append({
+        append({
             "id": sid,
             "artist": artist,
             "title": title,
             "is_new": is_new,
             "is_current": is_current,
-            "weeks_in_chart": weeks_in_chart,
+            "weeks_in_chart": _as_int(get("weeks_in_chart", 1), 1),
             "source": source,
-            "cover": cover,
-            "preview_url": preview_url,
-            "lock_media": lock_media,
+            "cover": get("cover"),
+            "preview_url": get("preview_url"),
+            "lock_media": bool(get("lock_media", False)),
         })
 
     return out
@@ -251,20 +406,22 @@ def load_songs_from_file() -> List[dict]:
         return []
 
     try:
-        raw = SONGS_PATH.read_text(encoding="utf-8-sig")
-    except Exception as e:
-        print(f"[BOOT] songs.json READ FAILED: {e}", flush=True)
+        loaded = _read_json_bom_safe(SONGS_PATH)
+    except orjson.JSONDecodeError as e:
+        print(f"[BOOT] songs.json JSON PARSE FAILED: {e}", flush=True)
+        try:
+            with open(SONGS_PATH, "rb") as f:
+                head_raw = _strip_bom(f.read(250 + len(_UTF8_BOM)))[:250]
+            head = head_raw.decode("utf-8", errors="replace").replace("\n", "\\n")
+            print(f"[BOOT] songs.json HEAD: {head}", flush=True)
+        except Exception:
+            pass
         return []
-
-    try:
-        loaded = json.loads(raw) if raw.strip() else []
     except Exception as e:
-        print(f"[BOOT] songs.json JSON PARSE FAILED: {e}", flush=True)
-        head = raw[:250].replace("\n", "\\n")
-        print(f"[BOOT] songs.json HEAD: {head}", flush=True)
+        print(f"[BOOT] songs.json READ FAILED: {e}", flush=True)
         return []
 
-    data = loaded
+    data = loaded if loaded is not None else []
 
     # если root dict — пробуем контейнеры
     if isinstance(data, dict):
@@ -302,23 +459,28 @@ def load_songs_from_file() -> List[dict]:
     return data
 
 
-def save_songs_to_file(items: List[dict]) -> None:
+def save_songs_to_file(items: List[dict]) -> List[dict]:
+    """
+    Возвращает ровно то, что легло в файл (и что вернул бы load_songs_from_file) —
+    можно сразу отдать в set_week_songs без повторного чтения.
+    """
     # нормализуем
     norm = normalize_songs(items)
 
     # 🛡️ если нормализация неожиданно "обнулила" непустой список — НЕ ПИШЕМ []
-    # сохраняем хотя бы сырые dict-объекты, чтобы не потерять файл
+    # сохраняем хотя бы сырые dict-объекты (без служебных "_" полей), чтобы не потерять файл
     if len(norm) == 0:
-        raw_list = [x for x in (items or []) if isinstance(x, dict)]
+        raw_list = [_public_song(x) for x in (items or []) if isinstance(x, dict)]
         if len(raw_list) > 0:
             print("[WARN] normalize_songs returned 0 -> writing raw_list to avoid wiping songs.json", flush=True)
             _atomic_write_json(SONGS_PATH, raw_list)
-            return
+            return raw_list
 
     _atomic_write_json(SONGS_PATH, norm)
+    return norm
 
 
-def load_votes_from_file() -> Tuple[Dict[int, Dict[int, int]], Dict[int, Dict[str, List[int]]]]:
+def load_votes_from_file() -> Tuple[Dict[int, Counter[int]], Dict[int, Dict[str, List[int]]]]:
     """
     Читает votes.json и возвращает (VOTES, USER_VOTES).
     Поддерживает:
@@ -330,13 +492,14 @@ def load_votes_from_file() -> Tuple[Dict[int, Dict[int, int]], Dict[int, Dict[st
         return {}, {}
 
     try:
-        raw = VOTES_PATH.read_text(encoding="utf-8-sig")
-        data = json.loads(raw) if raw.strip() else {}
+        data = _read_json_bom_safe(VOTES_PATH)
+        if data is None:
+            data = {}
         if not isinstance(data, dict):
             print(f"[BOOT] votes.json is not dict, got {type(data)}", flush=True)
             return {}, {}
 
-        votes_out: Dict[int, Dict[int, int]] = {}
+        votes_out: Dict[int, Counter[int]] = {}
         user_out: Dict[int, Dict[str, List[int]]] = {}
 
         for wk_str, payload in data.items():
@@ -371,7 +534,7 @@ def load_votes_from_file() -> Tuple[Dict[int, Dict[int, int]], Dict[int, Dict[st
                                 continue
                         umap[str(uid)] = out_ids
 
-                votes_out[wk] = vmap
+                votes_out[wk] = Counter(vmap)
                 user_out[wk] = umap
                 continue
 
@@ -384,7 +547,7 @@ def load_votes_from_file() -> Tuple[Dict[int, Dict[int, int]], Dict[int, Dict[st
                         vmap[int(sid_str)] = int(cnt)
                     except Exception:
                         continue
-                votes_out[wk] = vmap
+                votes_out[wk] = Counter(vmap)
                 user_out.setdefault(wk, {})
 
         print(f"[BOOT] votes.json loaded: weeks={len(votes_out)}", flush=True)
@@ -396,21 +559,142 @@ def load_votes_from_file() -> Tuple[Dict[int, Dict[int, int]], Dict[int, Dict[st
 
 
 def save_votes_to_file() -> None:
-    data: Dict[str, Any] = {}
-    for wk in set(list(VOTES.keys()) + list(USER_VOTES.keys())):
-        vmap = VOTES.get(wk, {})
-        umap = USER_VOTES.get(wk, {})
-        data[str(wk)] = {
-            "votes": {str(k): int(v) for k, v in vmap.items()},
-            "user_votes": {str(uid): [int(x) for x in xs] for uid, xs in umap.items()},
-        }
-    _atomic_write_json(VOTES_PATH, data)
+    """
+    Снапшот каждой недели снимаем под её VOTE_LOCKS[wk].
+    Вызывать НЕ держа лок недели (иначе дедлок).
+    Это же компакция журнала: после записи votes.json обрезаем votes.wal.
+    """
+    global VOTES_WAL_PENDING
+    # VOTES_WAL_LOCK держим от снапшота до обрезки: голос, дописанный в журнал
+    # до нас, уже есть в памяти (значит в снапшоте), а после — ляжет в чистый журнал
+    with VOTES_SAVE_LOCK, VOTES_WAL_LOCK:
+        # int-ключи (неделя, song_id) orjson сам пишет строками (OPT_NON_STR_KEYS),
+        # поэтому тут только поверхностные копии под локом — без str()/int() на каждый ключ.
+        # Списки в USER_VOTES не мутируются (только заменяются), копировать их не нужно.
+        # Неделя без новых голосов (та же VOTES_VERSION) берёт прошлый снапшот как есть —
+        # копируем только то, что изменилось с прошлой записи.
+        data: Dict[int, Any] = {}
+        for wk in VOTES.keys() | USER_VOTES.keys():
+            with VOTE_LOCKS[wk]:
+                version = VOTES_VERSION.get(wk, 0)
+                prev = _VOTES_SNAPSHOT.get(wk)
+                if prev is not None and prev[0] == version:
+                    data[wk] = prev[1]
+                    continue
+                data[wk] = {
+                    "votes": dict(VOTES.get(wk, {})),
+                    "user_votes": dict(USER_VOTES.get(wk, {})),
+                }
+                _VOTES_SNAPSHOT[wk] = (version, data[wk])
+        _atomic_write_json(VOTES_PATH, data)
+        _truncate_votes_wal()
+        VOTES_WAL_PENDING = 0
+
+
+def _truncate_votes_wal() -> None:
+    """Вызывать под VOTES_WAL_LOCK."""
+    if _VOTES_WAL_FILE is not None:
+        fd = _VOTES_WAL_FILE.fileno()
+    elif VOTES_WAL_PATH.exists():
+        fd = os.open(VOTES_WAL_PATH, os.O_WRONLY)
+    else:
+        return
+    try:
+        os.ftruncate(fd, 0)
+        os.fsync(fd)
+    finally:
+        if _VOTES_WAL_FILE is None:
+            os.close(fd)
+
+
+def append_vote_wal(week_id: int, user_id: str, song_ids: List[int]) -> None:
+    """
+    Голос -> одна строка в votes.wal (write + fsync): запись O(размер голоса),
+    а не O(все голоса). Вызывать НЕ держа лок недели.
+    """
+    global _VOTES_WAL_FILE, VOTES_WAL_PENDING
+    line = orjson.dumps({"wk": week_id, "uid": user_id, "ids": song_ids, "ts": int(time.time())}) + b"\n"
+    with VOTES_WAL_LOCK:
+        if _VOTES_WAL_FILE is None:
+            _VOTES_WAL_FILE = open(VOTES_WAL_PATH, "ab", buffering=0)
+        _write_all(_VOTES_WAL_FILE.fileno(), line)
+        _fdatasync(_VOTES_WAL_FILE.fileno())
+        VOTES_WAL_PENDING += 1
+        compact = VOTES_WAL_PENDING >= VOTES_WAL_COMPACT_EVERY
+    if compact:
+        mark_votes_dirty()
+
+
+def replay_votes_wal(
+    votes: Dict[int, Counter[int]],
+    users: Dict[int, Dict[str, List[int]]],
+) -> int:
+    """
+    Докатывает votes.wal поверх снапшота (на старте). Пользователь голосует
+    раз в неделю, поэтому уже учтённые (uid, неделя) пропускаем — повтор безопасен.
+    Битую хвостовую строку (упали посреди записи) просто игнорируем.
+    """
+    if not VOTES_WAL_PATH.exists():
+        return 0
+
+    applied = 0
+    with open(VOTES_WAL_PATH, "rb") as f:
+        for line in f:
+            try:
+                rec = orjson.loads(line)
+                wk = int(rec["wk"])
+                uid = str(rec["uid"])
+                ids = [int(x) for x in rec["ids"]]
+            except Exception:
+                continue
+            umap = users.setdefault(wk, {})
+            if umap.get(uid):
+                continue
+            votes.setdefault(wk, Counter()).update(ids)
+            umap[uid] = ids
+            applied += 1
+
+    print(f"[BOOT] votes.wal replayed: {applied} votes", flush=True)
+    return applied
+
+
+def mark_votes_dirty() -> None:
+    VOTES_DIRTY.set()
+
+
+def _votes_flusher_loop() -> None:
+    """
+    Фоновый писатель votes.json: ждём первый "грязный" голос,
+    копим ещё VOTES_FLUSH_DELAY секунд и пишем всё одним файлом.
+    """
+    while True:
+        VOTES_DIRTY.wait()
+        time.sleep(VOTES_FLUSH_DELAY)
+        # сбрасываем флаг ДО записи: голос во время записи поднимет его снова
+        VOTES_DIRTY.clear()
+        try:
+            save_votes_to_file()
+        except Exception as e:
+            print(f"[VOTES] flush failed: {e}", flush=True)
+            VOTES_DIRTY.set()
+
+
+_VOTES_FLUSHER: Optional[threading.Thread] = None
+
+
+def start_votes_flusher() -> None:
+    global _VOTES_FLUSHER
+    if _VOTES_FLUSHER is not None and _VOTES_FLUSHER.is_alive():
+        return
+    _VOTES_FLUSHER = threading.Thread(target=_votes_flusher_loop, name="votes-flusher", daemon=True)
+    _VOTES_FLUSHER.start()
 
 
 def require_admin(x_admin_token: Optional[str]) -> None:
     if not ADMIN_TOKEN:
         raise HTTPException(status_code=500, detail="ADMIN_TOKEN is not configured")
-    if not x_admin_token or x_admin_token != ADMIN_TOKEN:
+    # сравнение за постоянное время; байты — чтобы не-ASCII токен не ронял compare_digest
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("utf-8"), _ADMIN_TOKEN_B):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
@@ -426,14 +710,106 @@ def ensure_week_exists(week_id: int) -> None:
             return
 
     SONGS_BY_WEEK.setdefault(week_id, [])
-    VOTES.setdefault(week_id, {})
+    VOTES.setdefault(week_id, Counter())
     USER_VOTES.setdefault(week_id, {})
 
 
+def _index_song(s: dict) -> dict:
+    """
+    Служебные поля (с "_") — только для памяти, в ответ/файл не уходят.
+    """
+    s["_sort_key"] = (_norm(s.get("artist")), _norm(s.get("title")))
+    # готовая проекция под SongOut — собираем раз на запись, а не на запрос
+    s["_out"] = _song_out(s)
+    return s
+
+
+def _public_song(s: dict) -> dict:
+    return {k: v for k, v in s.items() if not str(k).startswith("_")}
+
+
+def _song_ids(items: List[dict]) -> frozenset[int]:
+    out: set[int] = set()
+    for s in items:
+        try:
+            out.add(int(s.get("id")))
+        except Exception:
+            continue
+    return frozenset(out)
+
+
+def _song_view(items: List[dict]) -> Tuple[Tuple[dict, ...], Tuple[str, ...]]:
+    """
+    artist и title через "\n": нормализованный запрос перевода строки
+    не содержит, так что одна проверка `q in blob` == "q в артисте или в названии".
+    """
+    return tuple(items), tuple("\n".join(s["_sort_key"]) for s in items)
+
+
+def _search_mask(q: str, blobs: Tuple[str, ...]) -> List[Any]:
+    """
+    Маска для compress по колонке blob'ов. Запрос из нескольких слов:
+    каждое слово должно найтись (в любом порядке, в артисте или в названии) —
+    одна регулярка из lookahead'ов, весь проход по колонке в C через map.
+    """
+    tokens = list(dict.fromkeys(q.split()))
+    if len(tokens) <= 1:
+        return [q in b for b in blobs]
+    pattern = re.compile("".join(f"(?=.*{re.escape(t)})" for t in tokens), re.S)
+    return list(map(pattern.match, blobs))
+
+
+def set_week_songs(week_id: int, items: Any) -> List[dict]:
+    """
+    Единая точка записи SONGS_BY_WEEK: кладём список и сразу
+    пересобираем индексы под /weeks/{id}/songs.
+    """
+    indexed: List[dict] = []
+    for s in (items if isinstance(items, list) else []):
+        if not isinstance(s, dict):
+            continue
+        # raw-fallback из load_songs_from_file может принести что угодно —
+        # битую строку выкидываем с логом, а не роняем старт/enrich
+        try:
+            indexed.append(_index_song(s))
+        except Exception as e:
+            print(f"[SONGS] week={week_id} drop bad row id={s.get('id')!r}: {type(e).__name__}: {e}", flush=True)
+    items = indexed
+
+    # срезы сразу в порядке выдачи (artist, title): compress порядок сохраняет,
+    # так что /weeks/{id}/songs больше не сортирует на каждый запрос.
+    # SONGS_BY_WEEK остаётся в порядке файла
+    ordered = sorted(items, key=operator.itemgetter("_sort_key"))
+
+    SONGS_BY_WEEK[week_id] = items
+    SONGS_VIEW_BY_WEEK[week_id] = {
+        "all": _song_view(ordered),
+        "new": _song_view([s for s in ordered if bool(s.get("is_new", False))]),
+        "current": _song_view([s for s in ordered if bool(s.get("is_current", False))]),
+    }
+    SONG_IDS_BY_WEEK[week_id] = _song_ids(items)
+
+    SONGS_VERSION[week_id] = SONGS_VERSION.get(week_id, 0) + 1
+    SONGS_RESPONSE_CACHE.clear()
+    return items
+
+
 def get_current_week() -> dict:
     return {"id": CURRENT_WEEK_ID}
 
 
+# bot_token -> секретный ключ WebAppData: зависит только от токена, считаем раз
+_TG_SECRET_KEYS: Dict[str, bytes] = {}
+
+
+def _telegram_secret_key(bot_token: str) -> bytes:
+    key = _TG_SECRET_KEYS.get(bot_token)
+    if key is None:
+        key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+        _TG_SECRET_KEYS[bot_token] = key
+    return key
+
+
 def _telegram_check_hash(init_data: str, bot_token: str) -> tuple[bool, str | None, dict]:
     if not init_data or not isinstance(init_data, str):
         return False, "EMPTY_INIT_DATA", {}
@@ -450,122 +826,314 @@ def _telegram_check_hash(init_data: str, bot_token: str) -> tuple[bool, str | No
     if not received_hash:
         return False, "NO_HASH", data
 
-    check_pairs = [(k, v) for (k, v) in data.items() if k != "hash"]
-    check_pairs.sort(key=lambda kv: kv[0])
-    data_check_string = "\n".join([f"{k}={v}" for k, v in check_pairs])
+    # строка проверки одним проходом по отсортированным ключам
+    data_check_string = "\n".join(f"{k}={data[k]}" for k in sorted(data) if k != "hash")
 
-    secret_key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
-    calc_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    secret_key = _telegram_secret_key(bot_token)
+    calc_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).digest()
 
-    if not hmac.compare_digest(calc_hash, (received_hash or "").lower()):
-        return False, "HASH_MISMATCH", {"keys": sorted(list(data.keys()))}
+    # сравниваем сырые 32 байта, а не hex-строки; кривой hex -> просто несовпадение
+    try:
+        received_raw = bytes.fromhex(received_hash)
+    except ValueError:
+        received_raw = b""
+    if not hmac.compare_digest(calc_hash, received_raw):
+        return False, "HASH_MISMATCH", {"keys": sorted(data.keys())}
 
     return True, None, data
 
 
+# initData -> (истекает_в (monotonic), user_id); только успешные проверки
+_TG_AUTH_CACHE: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+_TG_AUTH_CACHE_LOCK = threading.Lock()
+
+
 def user_id_from_telegram_init_data(init_data: str | None) -> str:
-    ok, err, data = _telegram_check_hash(init_data or "", TELEGRAM_BOT_TOKEN)
+    key = init_data or ""
+    now = time.monotonic()
+    with _TG_AUTH_CACHE_LOCK:
+        hit = _TG_AUTH_CACHE.get(key)
+        if hit is not None and hit[0] > now:
+            _TG_AUTH_CACHE.move_to_end(key)
+            return hit[1]
+
+    uid, auth_date = _user_id_from_telegram_init_data_uncached(key)
+
+    ttl = TG_AUTH_CACHE_TTL
+    if TG_AUTH_MAX_AGE > 0:
+        # запись в кэше не переживает свежесть самого initData
+        ttl = min(ttl, auth_date + TG_AUTH_MAX_AGE - time.time())
+
+    with _TG_AUTH_CACHE_LOCK:
+        _TG_AUTH_CACHE[key] = (now + ttl, uid)
+        _TG_AUTH_CACHE.move_to_end(key)
+        while len(_TG_AUTH_CACHE) > TG_AUTH_CACHE_MAX:
+            _TG_AUTH_CACHE.popitem(last=False)
+    return uid
+
+
+def _user_id_from_telegram_init_data_uncached(init_data: str) -> Tuple[str, int]:
+    """-> (user_id, auth_date)"""
+    ok, err, data = _telegram_check_hash(init_data, TELEGRAM_BOT_TOKEN)
     if not ok:
         raise HTTPException(status_code=401, detail=f"TELEGRAM_AUTH_FAILED:{err}")
 
+    try:
+        auth_date = int(data.get("auth_date") or 0)
+    except ValueError:
+        auth_date = 0
+    if TG_AUTH_MAX_AGE > 0 and time.time() - auth_date > TG_AUTH_MAX_AGE:
+        raise HTTPException(status_code=401, detail="TELEGRAM_AUTH_EXPIRED")
+
     user_raw = data.get("user")
     if not user_raw:
         raise HTTPException(status_code=401, detail="TELEGRAM_NO_USER")
 
+    # user уже url-декодирован parse_qsl в _telegram_check_hash
     try:
-        u = json.loads(user_raw)
+        u = orjson.loads(user_raw)
         uid = u.get("id")
         if not uid:
             raise ValueError("no id")
-        return str(uid)
+        return str(uid), auth_date
     except Exception:
         raise HTTPException(status_code=401, detail="TELEGRAM_BAD_USER_JSON")
 
 
+_NORM_PARENS_RE = re.compile(r"\(.*?\)")          # убираем скобки (feat., ver.)
+_NORM_PUNCT_RE = re.compile(r"[^a-z0-9가-힣]+")    # пунктуация (и пробелы) -> один пробел
+
+
 def _norm(s: Any) -> str:
-    return str(s or "").strip().lower()
+    # приводим к str ДО кэша: list/dict из кривого songs.json для lru_cache нехэшируемы
+    return _norm_str(str(s or ""))
 
 
-def _norm(s: str) -> str:
-    s = (s or "").lower().strip()
-    s = re.sub(r"\(.*?\)", " ", s)          # убираем скобки (feat., ver.)
+# одни и те же артисты/названия нормализуются снова и снова (индекс недели, iTunes, поиск)
+@lru_cache(maxsize=8192)
+def _norm_str(s: str) -> str:
+    s = s.lower().strip()
+    s = _NORM_PARENS_RE.sub(" ", s)
     s = s.replace("feat.", " ").replace("ft.", " ")
-    s = re.sub(r"[^a-z0-9가-힣]+", " ", s)    # пунктуация -> пробел
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # пробельные символы тоже попадают в класс выше — отдельный проход \s+ не нужен
+    return _NORM_PUNCT_RE.sub(" ", s).strip()
 
-def _score(artist_in: str, title_in: str, artist_it: str, title_it: str) -> float:
-    a1, t1 = _norm(artist_in), _norm(title_in)
+def _score(a1: str, t1: str, artist_it: str, title_it: str) -> float:
+    """
+    a1/t1 — уже нормализованный запрос (считаем раз на поиск, а не на каждый результат).
+    Порядок (запрос, кандидат) в SequenceMatcher не менять: ratio() несимметричен.
+    """
     a2, t2 = _norm(artist_it), _norm(title_it)
     a = SequenceMatcher(None, a1, a2).ratio()
     t = SequenceMatcher(None, t1, t2).ratio()
     return 0.45 * a + 0.55 * t
 
-def itunes_search_track(artist: str, title: str) -> Optional[dict]:
+# .../100x100bb.jpg -> .../600x600bb.jpg
+_ARTWORK_SIZE_RE = re.compile(r"/\d+x\d+bb\.(jpg|webp)$")
+
+
+def _make_itunes_session() -> requests.Session:
+    """
+    Одна сессия на весь процесс: keep-alive, TLS-рукопожатие один раз,
+    пул соединений под параллельный enrich.
+    """
+    sess = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        # повторяем только неудачное соединение; read=0 — зависший ответ не ждём повторно
+        max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2),
+    )
+    sess.mount("https://", adapter)
+    return sess
+
+
+ITUNES_SESSION = _make_itunes_session()
+
+
+def _itunes_fetch(artist: str, title: str) -> Optional[dict]:
+    """
+    Один поход в iTunes.
+    None — трек честно не нашли; сетевые/HTTP ошибки летят исключением,
+    чтобы их не закэшировать как "не нашли".
+    """
     q = f"{artist} {title}".strip()
     if not q:
         return None
 
+    r = ITUNES_SESSION.get(
+        "https://itunes.apple.com/search",
+        params={
+            "term": q,
+            "media": "music",
+            "entity": "song",
+            "limit": ITUNES_LIMIT,
+            "country": ITUNES_COUNTRY,
+        },
+        timeout=ITUNES_TIMEOUT,
+    )
+    r.raise_for_status()
+
+    data = r.json()
+    results = data.get("results") or []
+    if not results:
+        return None
+
+    a1, t1 = _norm(artist), _norm(title)
+    # лучший кандидат одним max(): при равенстве — первый по выдаче iTunes
+    best_score, best = max(
+        ((_score(a1, t1, item.get("artistName", ""), item.get("trackName", "")), item) for item in results),
+        key=operator.itemgetter(0),
+    )
+
+    # порог — ниже него лучше НЕ трогать, чем поставить чужое
+    if not best or best_score < 0.78:
+        return None
+
+    cover = best.get("artworkUrl100") or best.get("artworkUrl60")
+    if cover:
+        cover = _ARTWORK_SIZE_RE.sub("/600x600bb.\\1", cover)
+
+    preview = best.get("previewUrl")
+    return {"cover": cover, "preview_url": preview}
+
+
+def _itunes_cache_key(artist: str, title: str) -> str:
+    return f"{str(artist or '').strip().lower()}|{str(title or '').strip().lower()}"
+
+
+def load_itunes_cache_from_file() -> Dict[str, dict]:
+    if not ITUNES_CACHE_PATH.exists():
+        return {}
     try:
-        r = requests.get(
-            "https://itunes.apple.com/search",
-            params={
-                "term": q,
-                "media": "music",
-                "entity": "song",
-                "limit": ITUNES_LIMIT,
-                "country": ITUNES_COUNTRY,
-            },
-            timeout=12,
-        )
-        if r.status_code != 200:
-            return None
+        data = _read_json_bom_safe(ITUNES_CACHE_PATH)
+    except Exception as e:
+        print(f"[BOOT] itunes_cache.json FAILED to load: {e}", flush=True)
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {str(k): v for k, v in data.items() if isinstance(v, dict)}
 
-        data = r.json()
-        results = data.get("results") or []
-        if not results:
-            return None
 
-        best = None
-        best_score = -1.0
-        for item in results:
-            sc = _score(artist, title, item.get("artistName",""), item.get("trackName",""))
-            if sc > best_score:
-                best_score = sc
-                best = item
+def _itunes_cache_entry_fresh(v: dict, now: int) -> bool:
+    found = bool(v.get("cover") or v.get("preview_url"))
+    ttl = ITUNES_CACHE_TTL if found else ITUNES_CACHE_MISS_TTL
+    return now - int(v.get("ts") or 0) < ttl
 
-        # порог — ниже него лучше НЕ трогать, чем поставить чужое
-        if not best or best_score < 0.78:
-            return None
 
-        cover = best.get("artworkUrl100") or best.get("artworkUrl60")
-        if cover:
-            cover = re.sub(r"/\d+x\d+bb\.(jpg|webp)$", "/600x600bb.\\1", cover)
+def _prune_itunes_cache() -> None:
+    """
+    Протухшее — вон; если всё ещё больше ITUNES_CACHE_MAX — оставляем самые свежие.
+    Зовётся под ITUNES_CACHE_LOCK.
+    """
+    now = _now_ts()
+    for k in [k for k, v in ITUNES_CACHE.items() if not _itunes_cache_entry_fresh(v, now)]:
+        ITUNES_CACHE.pop(k, None)
+
+    extra = len(ITUNES_CACHE) - max(0, ITUNES_CACHE_MAX)
+    if extra > 0:
+        oldest = sorted(ITUNES_CACHE, key=lambda k: int(ITUNES_CACHE[k].get("ts") or 0))[:extra]
+        for k in oldest:
+            ITUNES_CACHE.pop(k, None)
 
-        preview = best.get("previewUrl")
-        return {"cover": cover, "preview_url": preview}
-    except Exception:
-        return None
 
+def save_itunes_cache_to_file() -> None:
+    with ITUNES_CACHE_LOCK:
+        _prune_itunes_cache()
+        snapshot = dict(ITUNES_CACHE)
+    # сериализуем копию уже без лока: воркеры не ждут записи на диск
+    _atomic_write_json(ITUNES_CACHE_PATH, snapshot)
+
+
+def itunes_search_track(artist: str, title: str, refresh: bool = False) -> Optional[dict]:
+    """
+    Поиск с кэшем (artist|title). Кэш только в памяти —
+    на диск его сбрасывает вызывающий (один раз за enrich).
+    refresh=True — кэш не читаем, но свежий ответ в него кладём.
+    """
+    key = _itunes_cache_key(artist, title)
+    hit = None if refresh else ITUNES_CACHE.get(key)
+    if isinstance(hit, dict) and _itunes_cache_entry_fresh(hit, _now_ts()):
+        if not (hit.get("cover") or hit.get("preview_url")):
+            return None
+        return {"cover": hit.get("cover"), "preview_url": hit.get("preview_url")}
 
-def _read_week_meta() -> dict:
     try:
-        if not WEEK_META_PATH.exists():
-            return {}
-        raw = WEEK_META_PATH.read_text(encoding="utf-8-sig")
-        data = json.loads(raw) if raw.strip() else {}
-        return data if isinstance(data, dict) else {}
+        res = _itunes_fetch(artist, title)
     except Exception:
-        return {}
+        return None
+
+    entry = {
+        "cover": (res or {}).get("cover"),
+        "preview_url": (res or {}).get("preview_url"),
+        "ts": _now_ts(),
+    }
+    with ITUNES_CACHE_LOCK:
+        ITUNES_CACHE[key] = entry
+    return res
+
 
 # =========================
 # WEEK META (voting window)
 # =========================
 
+# week_meta.json читается на каждый голос, а меняется только из админки (или руками):
+# держим разобранный файл, пока не сменился его stat — на голос один stat() вместо чтения+разбора.
+# ((st_ino, st_mtime_ns, st_size), meta) | None
+_WEEK_META_CACHE: Optional[Tuple[Tuple[int, int, int], dict]] = None
+
+
+def _file_stat_key(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Ключ версии файла; атомарная запись (replace) всегда даёт новый inode."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
 def load_week_meta() -> dict:
     """
-    week_meta.json:
+    Кэшированный week_meta (сверка по stat файла). Объект общий — только читать;
+    кто собирается менять и сохранять — берёт свою копию из _load_week_meta_file().
+    """
+    global _WEEK_META_CACHE
+    # stat — ДО чтения: если файл подменят посреди разбора, ключ уже не совпадёт
+    key = _file_stat_key(WEEK_META_PATH)
+    cached = _WEEK_META_CACHE
+    if cached is not None and key is not None and cached[0] == key:
+        return cached[1]
+
+    meta = _load_week_meta_file()
+    # окно голосования — из ISO opened_at / voting_closes_at, разбираем раз на версию файла;
+    # ручная правка строки сменит stat -> пересчитаем. Объект кэша никто не сохраняет,
+    # так что служебные поля в файл не попадут
+    for wk in meta["weeks"].values():
+        if isinstance(wk, dict):
+            opened_dt = _parse_opened_at_dt(wk.get("opened_at"))
+            wk["_opened_ts"] = opened_dt.timestamp() if opened_dt is not None else None
+            wk["_closes_ts"] = _parse_closes_at_ts(wk.get("voting_closes_at"))
+    if key is not None:
+        _WEEK_META_CACHE = (key, meta)
+    return meta
+
+
+def _parse_closes_at_ts(closes_at: Any) -> Optional[float]:
+    """voting_closes_at -> unix-время; нет строки / битый формат -> None (решает медленный путь)."""
+    if not isinstance(closes_at, str) or not closes_at.strip():
+        return None
+    try:
+        return datetime.fromisoformat(closes_at.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+def _load_week_meta_file() -> dict:
+    """
+    week_meta.json (единственный читатель файла):
     {
+      "current_week_id": 3,
+      "next_song_id": 101,
       "weeks": {
         "3": {
           "opened_at": "2026-01-20T12:00:00+03:00",
@@ -573,25 +1141,28 @@ def load_week_meta() -> dict:
         }
       }
     }
+    Верхние ключи сохраняем все: иначе mark_week_opened, пересохраняя файл,
+    терял current_week_id / next_song_id, записанные rollover'ом.
     """
     if not WEEK_META_PATH.exists():
         return {"weeks": {}}
 
     try:
-        raw = WEEK_META_PATH.read_text(encoding="utf-8-sig")
-        data = json.loads(raw) if raw.strip() else {}
+        data = _read_json_bom_safe(WEEK_META_PATH)
         if not isinstance(data, dict):
             return {"weeks": {}}
-        weeks = data.get("weeks")
-        if not isinstance(weeks, dict):
-            weeks = {}
-        return {"weeks": weeks}
+        if not isinstance(data.get("weeks"), dict):
+            data["weeks"] = {}
+        return data
     except Exception as e:
         print(f"[BOOT] week_meta.json FAILED: {e}", flush=True)
         return {"weeks": {}}
 
 def save_week_meta(meta: dict) -> None:
+    global _WEEK_META_CACHE
     _atomic_write_json(WEEK_META_PATH, meta)
+    # stat и так сменится; сбрасываем, чтобы не держать старый объект
+    _WEEK_META_CACHE = None
 
 def get_next_song_id(meta: dict) -> int:
     try:
@@ -615,7 +1186,7 @@ def ensure_next_song_id(meta: dict, items: list[dict]) -> dict:
     save_week_meta(meta)
     return meta
 
-def next_saturday_18_msk_iso(now_utc: Optional[datetime] = None) -> str:
+def next_saturday_18_msk_utc(now_utc: Optional[datetime] = None) -> datetime:
     if now_utc is None:
         now_utc = datetime.now(timezone.utc)
 
@@ -632,8 +1203,11 @@ def next_saturday_18_msk_iso(now_utc: Optional[datetime] = None) -> str:
     if target <= now_msk:
         target += timedelta(days=7)
 
-    target_utc = target.astimezone(timezone.utc)
-    return target_utc.replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    return target.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def next_saturday_18_msk_iso(now_utc: Optional[datetime] = None) -> str:
+    return next_saturday_18_msk_utc(now_utc).isoformat().replace("+00:00", "Z")
 
 def _get_week_block(meta: dict, week_id: int) -> dict:
     weeks = meta.get("weeks") if isinstance(meta, dict) else None
@@ -643,8 +1217,9 @@ def _get_week_block(meta: dict, week_id: int) -> dict:
     return wk if isinstance(wk, dict) else {}
 
 def get_week_opened_at_dt(meta: dict, week_id: int) -> Optional[datetime]:
-    wk = _get_week_block(meta, week_id)
-    s = wk.get("opened_at")
+    return _parse_opened_at_dt(_get_week_block(meta, week_id).get("opened_at"))
+
+def _parse_opened_at_dt(s: Any) -> Optional[datetime]:
     if not isinstance(s, str) or not s.strip():
         return None
     try:
@@ -672,6 +1247,16 @@ def assert_voting_open(meta: dict, week_id: int) -> None:
     1) Голосование разрешено только если неделя "открыта" (есть opened_at).
     2) И только до voting_closes_at (суббота 18:00 МСК -> в UTC).
     """
+    # быстрый путь: load_week_meta уже разобрал opened_at и voting_closes_at,
+    # на голос одно сравнение чисел без разбора дат
+    wk = _get_week_block(meta, week_id)
+    closes_ts = wk.get("_closes_ts")
+    if closes_ts is not None and wk.get("_opened_ts") is not None:
+        if time.time() >= closes_ts:
+            raise HTTPException(status_code=403, detail="VOTING_CLOSED")
+        return
+
+    # meta не из кэша / нет или битая дата — разбираем ISO-строки (там же VOTING_NOT_OPENED_YET)
     opened_dt = get_week_opened_at_dt(meta, week_id)
     if opened_dt is None:
         raise HTTPException(status_code=403, detail="VOTING_NOT_OPENED_YET")
@@ -681,7 +1266,7 @@ def assert_voting_open(meta: dict, week_id: int) -> None:
         raise HTTPException(status_code=403, detail="VOTING_CLOSED")
 
 def mark_week_opened(week_id: int) -> dict:
-    meta = load_week_meta()
+    meta = _load_week_meta_file()
     weeks = meta.get("weeks")
     if not isinstance(weeks, dict):
         weeks = {}
@@ -700,7 +1285,7 @@ def mark_week_opened(week_id: int) -> dict:
 # =========================
 # 4) APP
 # =========================
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -710,6 +1295,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# список песен — основной вес ответа, мелочь не жмём
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+
+# ответ на CORS preflight при allow_origins=["*"] всегда один и тот же —
+# заголовки собраны заранее (allow_headers=["*"] => эхо запрошенных заголовков)
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+]
+
+
+class PreflightMiddleware:
+    """
+    Голый ASGI-слой поверх CORS/GZip: OPTIONS-preflight (Origin +
+    Access-Control-Request-Method) отвечаем сразу, не проходя
+    CORSMiddleware, роутинг и зависимости FastAPI. Остальное — как было.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] != "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        has_origin = has_method = False
+        req_headers = None
+        for k, v in scope["headers"]:
+            if k == b"origin":
+                has_origin = True
+            elif k == b"access-control-request-method":
+                has_method = True
+            elif k == b"access-control-request-headers":
+                req_headers = v
+        if not (has_origin and has_method):
+            await self.app(scope, receive, send)
+            return
+
+        headers = list(_PREFLIGHT_HEADERS)
+        if req_headers:
+            headers.append((b"access-control-allow-headers", req_headers))
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+
+# добавлен последним => самый внешний слой
+app.add_middleware(PreflightMiddleware)
+
 
 # =========================
 # 5) STARTUP
@@ -724,24 +1360,44 @@ def startup_event():
 
     _ensure_data_dir()
 
-    meta = load_week_meta()
-    try:
-        CURRENT_WEEK_ID = int(meta.get("current_week_id") or CURRENT_WEEK_ID)
-    except Exception:
-        pass
+    def _load_votes() -> Tuple[Dict[int, Counter[int]], Dict[int, Dict[str, List[int]]], int]:
+        votes, users = load_votes_from_file()
+        return votes, users, replay_votes_wal(votes, users)
+
+    # голоса и кэш iTunes от номера недели не зависят — читаем их в фоне,
+    # пока основной поток идёт по цепочке meta -> CURRENT_WEEK_ID -> songs
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        votes_job = ex.submit(_load_votes)
+        itunes_job = ex.submit(load_itunes_cache_from_file)
+
+        meta = load_week_meta()
+        try:
+            CURRENT_WEEK_ID = int(meta.get("current_week_id") or CURRENT_WEEK_ID)
+        except Exception:
+            pass
+
+        items = load_songs_from_file()
+        set_week_songs(CURRENT_WEEK_ID, items)
 
-    items = load_songs_from_file()
-    SONGS_BY_WEEK[CURRENT_WEEK_ID] = items if isinstance(items, list) else []
+        votes_loaded, users_loaded, wal_applied = votes_job.result()
+        itunes_loaded = itunes_job.result()
 
-    votes_loaded, users_loaded = load_votes_from_file()
     VOTES.clear()
     USER_VOTES.clear()
     VOTES.update(votes_loaded)
     USER_VOTES.update(users_loaded)
 
-    VOTES.setdefault(CURRENT_WEEK_ID, {})
+    VOTES.setdefault(CURRENT_WEEK_ID, Counter())
     USER_VOTES.setdefault(CURRENT_WEEK_ID, {})
 
+    # журнал не пуст -> сразу в снапшот: votes.wal начнётся с нуля,
+    # и новые строки не приклеятся к битому хвосту
+    if wal_applied or (VOTES_WAL_PATH.exists() and VOTES_WAL_PATH.stat().st_size > 0):
+        save_votes_to_file()
+
+    ITUNES_CACHE.clear()
+    ITUNES_CACHE.update(itunes_loaded)
+
     try:
         sz = SONGS_PATH.stat().st_size if SONGS_PATH.exists() else None
     except Exception:
@@ -752,6 +1408,19 @@ def startup_event():
     print(f"[BOOT] SONGS_FILE_SIZE={sz}", flush=True)
     print(f"[BOOT] SONGS_COUNT={len(SONGS_BY_WEEK.get(CURRENT_WEEK_ID, []))}", flush=True)
 
+    start_votes_flusher()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # всегда: даже если флаг уже снят, фоновая запись могла не успеть
+    try:
+        VOTES_DIRTY.clear()
+        save_votes_to_file()
+        print("[SHUTDOWN] votes.json flushed", flush=True)
+    except Exception as e:
+        print(f"[SHUTDOWN] votes.json flush FAILED: {e}", flush=True)
+
 
 # =========================
 # 6) MODELS
@@ -769,6 +1438,37 @@ class SongOut(BaseModel):
     lock_media: bool = False
 
 
+def _song_out(s: dict) -> dict:
+    """
+    Проекция песни под SongOut — /weeks/{id}/songs отдаёт готовые байты
+    без response_model, поэтому поля/дефолты держим здесь руками.
+    """
+    return {
+        "id": _as_int(s.get("id"), 0),
+        "artist": str(s.get("artist") or ""),
+        "title": str(s.get("title") or ""),
+        "is_new": bool(s.get("is_new", False)),
+        "is_current": bool(s.get("is_current", False)),
+        "weeks_in_chart": _as_int(s.get("weeks_in_chart", 1), 1),
+        "source": str(s.get("source") or ""),
+        "cover": s.get("cover"),
+        "preview_url": s.get("preview_url"),
+        "lock_media": bool(s.get("lock_media", False)),
+    }
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match — слабое сравнение (RFC 9110): префикс W/ не учитываем ни с одной стороны."""
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 class VoteIn(BaseModel):
     song_ids: List[int] = Field(default_factory=list)
 
@@ -789,16 +1489,17 @@ class RolloverIn(BaseModel):
 # 7) ROUTES
 # =========================
 @app.get("/weeks/current")
-def weeks_current():
+async def weeks_current():
     return get_current_week()
 
 
-@app.get("/weeks/{week_id}/songs", response_model=List[SongOut])
-def weeks_songs(
+@app.get("/weeks/{week_id}/songs", responses={200: {"model": List[SongOut]}})
+async def weeks_songs(
     week_id: int,
     filter: Literal["all", "new", "current"] = "all",
     search: str = "",
     x_telegram_init_data: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
 ):
     # auth (если пришло — проверим; если нет — не ломаем)
     try:
@@ -809,28 +1510,43 @@ def weeks_songs(
 
     ensure_week_exists(week_id)
 
-    items = SONGS_BY_WEEK.get(week_id, [])
-    if not isinstance(items, list):
-        items = []
-
-    # фильтры
-    if filter == "new":
-        items = [s for s in items if bool((s or {}).get("is_new", False))]
-    elif filter == "current":
-        items = [s for s in items if bool((s or {}).get("is_current", False))]
-
-    # поиск
     q = _norm(search)
-    if q:
-        items = [
-            s for s in items
-            if q in _norm((s or {}).get("artist")) or q in _norm((s or {}).get("title"))
-        ]
-
-    # сортировка
-    items = items[:]
-    items.sort(key=lambda s: (_norm((s or {}).get("artist")), _norm((s or {}).get("title"))))
-    return items
+    # версию читаем ДО списка: если состав сменится посреди сборки,
+    # ответ ляжет под старую версию и отдан больше не будет
+    key = (week_id, SONGS_VERSION.get(week_id, 0), filter, q)
+
+    # pop + вставка обратно = "свежий" конец LRU (без move_to_end,
+    # который падает, если set_week_songs успел очистить кэш из другого потока)
+    cached = SONGS_RESPONSE_CACHE.pop(key, None)
+    if cached is None:
+        # фильтры — готовые срезы из set_week_songs
+        view_items, view_blobs = SONGS_VIEW_BY_WEEK.get(week_id, {}).get(filter, ((), ()))
+
+        # поиск: проход по колонке blob'ов, песни берём по маске лениво;
+        # без поиска — сам срез (кортеж), без копии
+        # (срезы уже отсортированы в set_week_songs)
+        items = compress(view_items, _search_mask(q, view_blobs)) if q else view_items
+
+        body = orjson.dumps([s["_out"] for s in items])
+        # слабый тег: GZipMiddleware отдаёт под ним и gzip-, и identity-байты,
+        # сильный ETag для двух разных тел был бы враньём
+        etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        cached = (body, etag)
+
+    SONGS_RESPONSE_CACHE[key] = cached
+    while len(SONGS_RESPONSE_CACHE) > SONGS_RESPONSE_CACHE_MAX:
+        try:
+            SONGS_RESPONSE_CACHE.popitem(last=False)
+        except KeyError:
+            break
+
+    body, etag = cached
+    # no-cache: состав меняют enrich/replace/rollover — клиент каждый раз сверяет ETag
+    # (ответ 304 без тела), иначе голосовал бы по уже удалённым id
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/weeks/{week_id}/vote")
@@ -856,28 +1572,34 @@ def vote_week(
         if len(song_ids) > VOTE_LIMIT_PER_USER:
             raise HTTPException(status_code=400, detail=f"Too many votes. Limit={VOTE_LIMIT_PER_USER}")
 
-        # проверка существования песен
-        items = SONGS_BY_WEEK.get(week_id, [])
-        if not isinstance(items, list):
-            items = []
-        exists = {int(s.get("id")) for s in items if isinstance(s, dict) and s.get("id") is not None}
-        for sid in song_ids:
-            if sid not in exists:
-                raise HTTPException(status_code=400, detail=f"Unknown song id: {sid}")
+        # проверка существования песен (индекс собирает set_week_songs)
+        exists = SONG_IDS_BY_WEEK.get(week_id, frozenset())
+        if not exists.issuperset(song_ids):
+            # медленный путь только для ошибки: первый неизвестный id по порядку
+            bad = next(sid for sid in song_ids if sid not in exists)
+            raise HTTPException(status_code=400, detail=f"Unknown song id: {bad}")
 
-        # повторное голосование
-        USER_VOTES.setdefault(week_id, {})
-        if user_id in USER_VOTES[week_id] and USER_VOTES[week_id][user_id]:
-            raise HTTPException(status_code=409, detail="User already voted this week")
+        with VOTE_LOCKS[week_id]:
+            # повторное голосование
+            USER_VOTES.setdefault(week_id, {})
+            if user_id in USER_VOTES[week_id] and USER_VOTES[week_id][user_id]:
+                raise HTTPException(status_code=409, detail="User already voted this week")
 
-        # записываем
-        VOTES.setdefault(week_id, {})
-        for sid in song_ids:
-            VOTES[week_id][sid] = int(VOTES[week_id].get(sid, 0)) + 1
+            # записываем
+            # Counter.update — весь список одним вызовом в C
+            VOTES.setdefault(week_id, Counter()).update(song_ids)
 
-        USER_VOTES[week_id][user_id] = song_ids
+            USER_VOTES[week_id][user_id] = song_ids
+            # версию двигаем ПОСЛЕ мутации: увидел новую версию -> увидишь и голос
+            VOTES_VERSION[week_id] = VOTES_VERSION.get(week_id, 0) + 1
 
-        save_votes_to_file()
+        # на диск — строкой в журнал; снапшот votes.json — фоновым потоком раз в N голосов
+        try:
+            append_vote_wal(week_id, user_id, song_ids)
+        except Exception as e:
+            # голос уже в памяти: журнал не дописался — пусть ляжет снапшотом
+            print(f"[VOTES] wal append failed: {e}", flush=True)
+            mark_votes_dirty()
 
         return {"ok": True, "week_id": week_id, "user_id": user_id, "votes": len(song_ids)}
 
@@ -905,7 +1627,7 @@ def admin_archive_week(
         "week_id": week_id,
         "archived_at": datetime.now(MSK).replace(microsecond=0).isoformat(),
         "unique_voters": len([u for u in umap.keys()]),
-        "songs": items,
+        "songs": [_public_song(s) for s in items if isinstance(s, dict)],
         "votes": {str(k): int(v) for k, v in vmap.items()},
     }
 
@@ -1009,6 +1731,8 @@ def admin_enrich_current_week(
         skipped = 0
         processed = 0
 
+        # сначала собираем, кого реально надо искать в iTunes
+        jobs: List[Tuple[dict, str, str]] = []
         for s in items:
             if not isinstance(s, dict):
                 continue
@@ -1033,10 +1757,31 @@ def admin_enrich_current_week(
             if not artist or not title:
                 continue
 
-            res = itunes_search_track(artist, title)
+            jobs.append((s, artist, title))
+
+        # одинаковые artist|title (дубли, переносы) ищем один раз
+        uniq: Dict[str, Tuple[str, str]] = {}
+        for _, artist, title in jobs:
+            uniq.setdefault(_itunes_cache_key(artist, title), (artist, title))
+
+        # запросы к iTunes — параллельно (сеть), результаты применяем в одном потоке;
+        # force — заодно обновляем кэш, а не верим ему
+        found: Dict[str, Optional[dict]] = {}
+        if uniq:
+            with ThreadPoolExecutor(max_workers=max(1, ITUNES_WORKERS)) as ex:
+                found = dict(zip(
+                    uniq.keys(),
+                    ex.map(lambda p: itunes_search_track(p[0], p[1], refresh=force), uniq.values()),
+                ))
+
+        for s, artist, title in jobs:
+            res = found.get(_itunes_cache_key(artist, title))
             if not res:
                 continue
 
+            cover = s.get("cover")
+            preview = s.get("preview_url")
+
             if (force or not cover) and res.get("cover"):
                 s["cover"] = res.get("cover")
 
@@ -1045,12 +1790,20 @@ def admin_enrich_current_week(
 
             updated += 1
 
+        # кэш iTunes — один раз за прогон, не на каждую песню
+        if jobs:
+            try:
+                save_itunes_cache_to_file()
+            except Exception as e:
+                print(f"[WARN] itunes_cache.json save failed: {e}", flush=True)
+
         # persist to file (железно) — ПОСЛЕ цикла
-        save_songs_to_file(items)
+        written = save_songs_to_file(items)
         mark_week_opened(week_id)
 
-        # и обновим память нормализованно (чтобы is_current подсчитал и т.д.)
-        SONGS_BY_WEEK[week_id] = load_songs_from_file()
+        # и обновим память нормализованно (чтобы is_current подсчитал и т.д.) —
+        # тем же списком, что записали, без перечитывания songs.json
+        set_week_songs(week_id, written)
 
         return {
             "ok": True,
@@ -1087,7 +1840,7 @@ def admin_replace_songs(
     if len(norm) == 0 and len(body.items) > 0:
         raise HTTPException(status_code=400, detail="BAD_ITEMS_NORMALIZE_WIPED")
 
-    SONGS_BY_WEEK[week_id] = norm
+    set_week_songs(week_id, norm)
     save_songs_to_file(norm)
 
     return {"ok": True, "week_id": week_id, "count": len(norm)}
@@ -1103,7 +1856,7 @@ def debug_votes_path():
     return {"path": str(VOTES_PATH), "exists": exists, "size": size}
 
 @app.get("/__debug/votes_loaded")
-def debug_votes_loaded():
+async def debug_votes_loaded():
     # покажет какие недели реально в памяти
     weeks = sorted(list(VOTES.keys()))
     return {
@@ -1168,8 +1921,8 @@ def admin_rollover_week(
         ns["weeks_in_chart"] = w + 1
         carried.append(ns)
 
-    # meta: current_week_id + next_song_id
-    meta = load_week_meta()
+    # meta: current_week_id + next_song_id (своя копия — будем менять и сохранять)
+    meta = _load_week_meta_file()
     meta = ensure_next_song_id(meta, prev_items)
 
     next_id = get_next_song_id(meta)
@@ -1199,11 +1952,11 @@ def admin_rollover_week(
     items = carried + new_items
 
     # применяем
-    SONGS_BY_WEEK[week_id] = items
+    set_week_songs(week_id, items)
     save_songs_to_file(items)
 
     # подготовим структуры голосов на новую неделю
-    VOTES.setdefault(week_id, {})
+    VOTES.setdefault(week_id, Counter())
     USER_VOTES.setdefault(week_id, {})
 
     # обновим meta: текущая неделя + следующий id
@@ -1228,14 +1981,8 @@ def admin_rollover_week(
     }
 
 
-@app.get("/admin/weeks/{week_id}/votes/summary")
-def admin_votes_summary(
-    week_id: int,
-    x_admin_token: Optional[str] = Header(default=None),
-):
-    require_admin(x_admin_token)
-    ensure_week_exists(week_id)
-
+def _build_vote_rows(week_id: int) -> List[Tuple[tuple, Dict[str, Any]]]:
+    """Строки summary без сортировки: [(ключ сортировки, строка), ...]."""
     items = SONGS_BY_WEEK.get(week_id, [])
     if not isinstance(items, list):
         items = []
@@ -1244,54 +1991,96 @@ def admin_votes_summary(
     if not isinstance(votes_map, dict):
         votes_map = {}
 
-    rows: List[Dict[str, Any]] = []
+    # (ключ сортировки, строка): ключ из готового _sort_key, без _norm на каждую строку.
+    # Строка = готовая проекция _out (собрана в set_week_songs) + votes:
+    # одна копия dict на C-уровне вместо десятка .get() на каждую песню.
+    keyed: List[Tuple[tuple, Dict[str, Any]]] = []
     for s in items:
         if not isinstance(s, dict):
             continue
-        sid = int(s.get("id") or 0)
-        rows.append({
-            "id": sid,
-            "artist": s.get("artist"),
-            "title": s.get("title"),
-            "is_new": bool(s.get("is_new", False)),
-            "is_current": bool(s.get("is_current", False)),
-            "weeks_in_chart": s.get("weeks_in_chart"),
-            "source": s.get("source"),
-            "cover": s.get("cover"),
-            "preview_url": s.get("preview_url"),
-            "lock_media": bool(s.get("lock_media", False)),
-            "votes": int(votes_map.get(sid, 0)),
-        })
+        out = s["_out"]
+        votes = int(votes_map.get(out["id"], 0))
+        keyed.append(((-votes, *s["_sort_key"]), {**out, "votes": votes}))
+    return keyed
+
 
-    rows.sort(key=lambda r: (-int(r.get("votes", 0)), _norm(r.get("artist")), _norm(r.get("title"))))
+def _ranked_vote_rows(week_id: int) -> List[Dict[str, Any]]:
+    """
+    Строки summary в порядке рейтинга. Сортируем раз на версию
+    (состав недели + голоса), summary и top читают один и тот же список.
+    """
+    # версию берём ДО сборки: голос посреди сборки просто сменит версию
+    version = (SONGS_VERSION.get(week_id, 0), VOTES_VERSION.get(week_id, 0))
+    cached = VOTES_RANKING_CACHE.get(week_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
 
+    keyed = _build_vote_rows(week_id)
+    keyed.sort(key=operator.itemgetter(0))
+    rows = [row for _, row in keyed]
+    VOTES_RANKING_CACHE[week_id] = (version, rows)
+    return rows
+
+
+def _votes_summary(week_id: int) -> dict:
+    rows = _ranked_vote_rows(week_id)
     return {"ok": True, "week_id": week_id, "total_songs": len(rows), "rows": rows}
 
 
+# summary/top — чистые JSON-типы: отдаём ORJSONResponse сразу,
+# минуя jsonable_encoder по всем строкам
+@app.get("/admin/weeks/{week_id}/votes/summary")
+def admin_votes_summary(
+    week_id: int,
+    x_admin_token: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    require_admin(x_admin_token)
+    ensure_week_exists(week_id)
+
+    # summary меняется только с голосами или составом недели — ими и версионируем
+    # слабый: тело >1000 байт GZipMiddleware сжимает, байты по кодировкам разные
+    etag = f'W/"{_BOOT_ID}-{week_id}-{SONGS_VERSION.get(week_id, 0)}-{VOTES_VERSION.get(week_id, 0)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached = VOTES_SUMMARY_CACHE.get(week_id)
+    if cached is None or cached[0] != etag:
+        cached = (etag, orjson.dumps(_votes_summary(week_id)))
+        VOTES_SUMMARY_CACHE[week_id] = cached
+    return Response(content=cached[1], media_type="application/json", headers=headers)
+
+
 @app.get("/admin/weeks/{week_id}/votes/top")
 def admin_votes_top(
     week_id: int,
     n: int = 10,
     x_admin_token: Optional[str] = Header(default=None),
 ):
-    data = admin_votes_summary(week_id, x_admin_token)
+    require_admin(x_admin_token)
+    ensure_week_exists(week_id)
+
+    # рейтинг уже отсортирован (и закэширован по версии) — топ-n это срез
+    rows = _ranked_vote_rows(week_id)
     n = max(0, int(n))
-    return {
+    return ORJSONResponse({
         "ok": True,
-        "week_id": data["week_id"],
-        "total_songs": data["total_songs"],
+        "week_id": week_id,
+        "total_songs": len(rows),
         "n": n,
-        "rows": data["rows"][:n],
-    }
+        "rows": rows[:n],
+    })
 
 
 @app.get("/admin/weeks/current/votes/summary")
 def admin_votes_summary_current(
     x_admin_token: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
 ):
     require_admin(x_admin_token)
     wk = get_current_week()
-    return admin_votes_summary(int(wk["id"]), x_admin_token)
+    return admin_votes_summary(int(wk["id"]), x_admin_token, if_none_match)
 
 
 # -------------------------
@@ -1327,8 +2116,7 @@ def debug_songs_file():
     list_count = None
     err = None
     try:
-        text = b.decode("utf-8-sig")
-        data = json.loads(text)
+        data = orjson.loads(_strip_bom(b))
         top_type = type(data).__name__
         if isinstance(data, list):
             list_count = len(data)
@@ -1348,18 +2136,19 @@ def debug_songs_file():
 
 
 @app.get("/__debug/songs_count")
-def debug_songs_count():
+async def debug_songs_count():
     items = SONGS_BY_WEEK.get(CURRENT_WEEK_ID, [])
     return {
         "current_week_id": CURRENT_WEEK_ID,
         "weeks_keys": list(SONGS_BY_WEEK.keys()),
         "count": len(items) if isinstance(items, list) else None,
-        "first": items[0] if isinstance(items, list) and len(items) > 0 else None,
+        # служебные "_" поля (индекс, проекция) наружу не отдаём
+        "first": _public_song(items[0]) if isinstance(items, list) and len(items) > 0 else None,
     }
 
 
 @app.get("/__debug/telegram_auth")
-def debug_telegram_auth(x_telegram_init_data: str | None = Header(default=None)):
+async def debug_telegram_auth(x_telegram_init_data: str | None = Header(default=None)):
     ok, err, data = _telegram_check_hash(x_telegram_init_data or "", TELEGRAM_BOT_TOKEN)
     return {
         "ok": ok,
@@ -1379,11 +2168,11 @@ def debug_songs_parse():
         if not SONGS_PATH.exists():
             return {"path": str(SONGS_PATH), "exists": False}
 
-        raw = SONGS_PATH.read_text(encoding="utf-8-sig")
-        head = raw[:250]
+        raw = _strip_bom(SONGS_PATH.read_bytes())
+        head = raw[:250].decode("utf-8", errors="replace")
 
         try:
-            data = json.loads(raw) if raw.strip() else None
+            data = orjson.loads(raw) if raw.strip() else None
             top_type = type(data).__name__
             list_count = len(data) if isinstance(data, list) else None
         except Exception as e: